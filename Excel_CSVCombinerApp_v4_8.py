@@ -1,13 +1,38 @@
 import pandas as pd
+import numpy as np
+import openpyxl
 import os
 import glob
 import json
+import codecs
+import itertools
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+from combine_core import convert_cells, parquet_cache_path, read_parquet_cache, write_parquet_cache
+
+try:
+    import pyarrow  # Optional: enables the faster pyarrow CSV engine and writer
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
+try:
+    import xlsxwriter  # Optional: writes XLSX reports row by row with low memory use
+except ImportError:
+    xlsxwriter = None
+
 # --- CONFIGURATION ---
 CONFIG_FILE = 'config.json'
+CACHE_DIR = '.combiner_cache'
+
+# With copy-on-write, row slices and column selections are lazy views instead of copies.
+# pandas 3 always works this way (and warns if the option is set), so only pandas 2 needs it.
+if pd.__version__.startswith('2.'):
+    pd.set_option('mode.copy_on_write', True)
 
 # --- Settings Management ---
 
@@ -37,7 +62,9 @@ def load_settings():
             "enable_lookup_txt": False,
             "lookup_txt_delimiter": "\\t",
             "lookup_header_row": 1,
-            "lookup_data_start_row": 2
+            "lookup_data_start_row": 2,
+            "fast_io": False,
+            "enable_parquet_cache": False
         }
 
 def save_settings(settings):
@@ -47,30 +74,349 @@ def save_settings(settings):
 
 # Helper function to make column names unique
 def _make_columns_unique(columns):
-    """Takes a list of column names and makes them unique by adding suffixes."""
-    seen = {}
-    new_columns = []
-    for col in columns:
-        col_str = str(col) # Ensure column name is a string
-        if col_str in seen:
-            seen[col_str] += 1
-            new_columns.append(f"{col_str}.{seen[col_str]}")
+    """Takes a list of column names and makes them unique by adding suffixes.
+    Always returns a list of str, so callers can assign it to .columns without another cast."""
+    # Ensure column names are strings; numpy's cast turns NaN into 'nan' like str() does
+    names = np.asarray(columns, dtype=object).astype(str)
+    # Most headers have no repeated names, so skip the grouping for them
+    if pd.Index(names).is_unique:
+        return names.tolist()
+    # cumcount numbers repeated names 0, 1, 2... so the first occurrence keeps its name
+    dup = pd.Series(names).groupby(names, sort=False).cumcount().to_numpy()
+    return np.where(dup == 0, names, np.char.add(np.char.add(names, '.'), dup.astype(str))).tolist()
+
+# Helper function to read CSV/TXT files with the fastest suitable parser
+def _read_delimited(file_path, encoding, sep=',', fast_io=False, header=None, usecols=None):
+    """Reads a delimited file. The C engine handles single-character delimiters; the slower
+    python engine is only needed for multi-character ones. dtype=str keeps values exactly as
+    written (e.g. leading zeros in SKUs) instead of guessing numeric types."""
+    if fast_io and pyarrow is not None and len(sep) == 1:
+        # dtype=str makes pandas decode the text itself, so bad UTF-8 still raises UnicodeDecodeError.
+        # pyarrow decodes header names on its own and fails with a different error, so the header row
+        # is read as data and promoted here.
+        try:
+            df = pd.read_csv(file_path, header=None, usecols=usecols, on_bad_lines='error', encoding=encoding, sep=sep, engine='pyarrow', dtype=str)
+        except (pd.errors.ParserError, pyarrow.ArrowException):
+            # pyarrow takes the column count from the first line and, unlike the C engine, would also skip
+            # shorter lines, so title rows narrower than the data lose the whole table. The C engine below
+            # finds the header row by count and reads such files like before.
+            df = None
+        if df is not None:
+            if header is None:
+                return df
+            data_df = df.iloc[header + 1:].reset_index(drop=True)
+            data_df.columns = df.iloc[header]
+            return data_df
+    engine = 'c' if len(sep) == 1 else 'python'
+    return pd.read_csv(file_path, header=header, usecols=usecols, on_bad_lines='skip', encoding=encoding, sep=sep, engine=engine, dtype=str)
+
+# Helper function to read just the header row of a CSV/TXT file
+def _read_header_names(file_path, encoding, sep, header_row_index):
+    """Parses only the lines up to the header row and returns its unique column names,
+    or None if the file has fewer lines than that."""
+    engine = 'c' if len(sep) == 1 else 'python'
+    try:
+        header = pd.read_csv(file_path, header=header_row_index, nrows=0, on_bad_lines='skip', encoding=encoding, sep=sep, engine=engine)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError):
+        return None  # "Passed header=N but only M lines in file", or an empty file
+    return _make_columns_unique(_restore_empty_names(header.columns))
+
+# Helper function to undo pandas' names for empty header cells
+def _restore_empty_names(columns):
+    """A header=N read names empty header cells 'Unnamed: <position>'. Turns them back into NaN,
+    as they were with header=None, so these columns are named 'nan', 'nan.1'... by every reader."""
+    return [np.nan if col == f"Unnamed: {i}" else col for i, col in enumerate(columns)]
+
+# Helper function to drop the rows between the header and the first data row
+def _skip_to_data_rows(df, header_row_index, data_start_row_index):
+    """Takes a frame read with header=header_row_index and drops the rows before data_start_row_index.
+    Counting rows after parsing keeps the same blank-line handling as the header row itself."""
+    return df.iloc[max(data_start_row_index - header_row_index - 1, 0):].reset_index(drop=True)
+
+# Helper function to measure a sheet row
+def _row_width(row):
+    """Returns the number of cells in the row, not counting trailing empty ones, as pd.read_excel does."""
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+# Helper function to stream the needed part of an Excel sheet
+def _read_excel_sheet(file_path, sheet_name, header_row_index, data_start_row_index, columns_to_extract):
+    """
+    Reads one sheet with openpyxl in read-only mode, keeping only the header row and the
+    requested columns from the data start row onward. This avoids building cell objects for
+    the whole workbook. Returns (data_df, missing_cols), or (None, []) if the header row is missing
+    or the sheet ends before the data start row.
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        # Like pd.read_excel, ignore the stored sheet size: when it is stale, the stream stops early or cuts columns
+        ws.reset_dimensions()
+        header = next(ws.iter_rows(min_row=header_row_index + 1, max_row=header_row_index + 1, values_only=True), None)
+        if not header:
+            return None, []
+        # Header cells are converted like the data cells; pd.read_excel reads empty ones as NaN, so they keep their 'nan' names
+        header_names = [np.nan if value is None else value for value in convert_cells(header)]
+
+        if columns_to_extract:
+            unique_column_names = _make_columns_unique(header_names)
+            column_positions = {col: i for i, col in enumerate(unique_column_names)}
+            existing_cols = [col for col in columns_to_extract if col in column_positions]
+            missing_cols = [col for col in columns_to_extract if col not in column_positions]
+            positions = [column_positions[col] for col in existing_cols]
         else:
-            seen[col_str] = 0
-            new_columns.append(col_str)
-    return new_columns
+            # Like pd.read_excel, the sheet is as wide as its longest row, so the rows above the data
+            # count too and cells right of the header become unnamed columns
+            missing_cols = []
+            above_data = itertools.islice(ws.iter_rows(values_only=True), data_start_row_index)
+            width = max([_row_width(header)] + [_row_width(row) for row in above_data])
+
+        rows = []
+        rows_with_data = 0
+        for row in ws.iter_rows(min_row=data_start_row_index + 1, values_only=True):
+            if columns_to_extract:
+                rows.append(tuple(row[i] if i < len(row) else None for i in positions))
+                if any(value is not None for value in row):
+                    rows_with_data = len(rows)
+            else:
+                row_width = _row_width(row)
+                width = max(width, row_width)
+                rows.append(row)
+                if row_width:
+                    rows_with_data = len(rows)
+
+        # Like the previous len(df_full) < data_start_row_index check, skip a sheet whose rows end
+        # before the row above the data. With no data rows, only that row can still be non-empty
+        if not rows_with_data and data_start_row_index > header_row_index + 1:
+            row_above_data = next(ws.iter_rows(min_row=data_start_row_index, max_row=data_start_row_index, values_only=True), None)
+            if not row_above_data or not _row_width(row_above_data):
+                return None, []
+    finally:
+        wb.close()
+
+    # pd.read_excel drops trailing rows that are empty in every cell, not just in the extracted ones.
+    # Cells are converted only now, so error and 'NA' cells still count as data there, as they did in pandas
+    del rows[rows_with_data:]
+    if not columns_to_extract:
+        existing_cols = _make_columns_unique(header_names[:width] + [np.nan] * (width - len(header_names)))
+        rows = [convert_cells(row[:width]) + [None] * (width - len(row)) for row in rows]
+    else:
+        rows = [convert_cells(row) for row in rows]
+    # dtype=object keeps the converted values as they are, like the previous header=None read did
+    return pd.DataFrame(rows, columns=existing_cols, dtype=object), missing_cols
+
+# Helper function to combine the per-file frames
+def _concat_frames(frames):
+    """
+    Combines frames row-wise. When every frame has the same columns (the usual case), each
+    column's arrays are joined with np.concatenate, which skips pd.concat's index and block
+    handling. Frames with differing columns fall back to pd.concat to align them.
+    """
+    columns = list(frames[0].columns)
+    if any(list(df.columns) != columns for df in frames[1:]):
+        return pd.concat(frames, ignore_index=True)
+    return pd.DataFrame({col: np.concatenate([df[col].to_numpy() for df in frames]) for col in columns}, copy=False)
+
+# Helper function to write the CSV report
+def _write_csv(df, full_output_path, fast_io=False):
+    """
+    Writes the report as UTF-8 CSV with a BOM. With fast I/O, pyarrow's column-wise writer is used.
+    Columns Arrow has no single type for (e.g. one that mixes text and numbers, as most Excel
+    columns do) are written as str() of every cell, as to_csv writes them.
+    """
+    if not fast_io or pyarrow is None:
+        df.to_csv(full_output_path, index=False, encoding='utf-8-sig')
+        return
+    arrays = []
+    # By position, so a repeated column name (e.g. from the merge) still gives one array
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        try:
+            arrays.append(pyarrow.Array.from_pandas(column))
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError):
+            # OverflowError: whole numbers past int64, such as 20-digit product IDs
+            values = column.to_numpy(dtype=object)
+            arrays.append(pyarrow.array([str(value) for value in values], mask=pd.isna(values)))
+    table = pyarrow.Table.from_arrays(arrays, names=[str(col) for col in df.columns])
+    with open(full_output_path, 'wb') as f:
+        f.write(b'\xef\xbb\xbf')  # Same BOM that encoding='utf-8-sig' writes
+        pyarrow.csv.write_csv(table, f, write_options=pyarrow.csv.WriteOptions(include_header=True))
+
+# Helper function to write the XLSX report
+def _write_xlsx(df, full_output_path):
+    """
+    Writes the report as XLSX. With xlsxwriter installed, rows are streamed to disk in
+    constant_memory mode instead of holding a cell object for every value. pandas' to_excel
+    writes column by column, which that mode cannot handle, so rows are written here directly.
+    """
+    if xlsxwriter is None:
+        df.to_excel(full_output_path, index=False)
+        return
+
+    # xlsxwriter silently skips cells past the sheet limits, so fail like to_excel does instead
+    max_rows, max_cols = 1048576, 16384
+    if len(df) + 1 > max_rows or len(df.columns) > max_cols:
+        raise ValueError(
+            f"This sheet is too large! Your sheet size is: {len(df) + 1}, {len(df.columns)} "
+            f"Max sheet size is: {max_rows}, {max_cols}"
+        )
+
+    # Object arrays with None for missing values; xlsxwriter leaves None cells blank
+    column_values = []
+    for col in df.columns:
+        values = df[col].to_numpy(dtype=object, copy=True)
+        values[df[col].isna().to_numpy()] = None
+        column_values.append(values)
+
+    workbook = xlsxwriter.Workbook(full_output_path, {
+        'constant_memory': True,
+        'strings_to_urls': False,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    try:
+        worksheet = workbook.add_worksheet('Sheet1')
+        # The same bold, bordered and centred header cells as pandas 2's to_excel writes
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        worksheet.write_row(0, 0, list(df.columns), header_format)
+        for row_index, row in enumerate(zip(*column_values), 1):
+            worksheet.write_row(row_index, 0, row)
+    finally:
+        workbook.close()
 
 # --- Core File Processing Logic ---
 
+def _read_text_columns(file_path, encoding, sep, header_row_index, data_start_row_index, columns, fast_io):
+    """
+    Reads the header row first, then parses only the requested columns (all columns if none are
+    given). Selecting by position also works for duplicate names and for the pyarrow engine.
+    Returns (data_df, missing_cols), or (None, []) if the file ends before the header or data start row.
+    """
+    column_names = _read_header_names(file_path, encoding, sep, header_row_index)
+    if column_names is None:
+        return None, []
+    column_positions = {col: i for i, col in enumerate(column_names)}
+
+    missing_cols = []
+    if columns:
+        existing_cols = [col for col in columns if col in column_positions]
+        missing_cols = [col for col in columns if col not in column_positions]
+        if not existing_cols:
+            return pd.DataFrame(), missing_cols  # Nothing to parse
+    else:
+        existing_cols = column_names
+
+    positions = sorted(column_positions[col] for col in existing_cols)
+    df = _read_delimited(file_path, encoding, sep=sep, fast_io=fast_io, header=header_row_index, usecols=positions)
+    df.columns = [column_names[i] for i in positions]
+    # Like the previous len(df_full) < data_start_row_index check on the whole file, header row included
+    if header_row_index + 1 + len(df) < data_start_row_index:
+        return None, []
+    data_df = _skip_to_data_rows(df, header_row_index, data_start_row_index)
+    return data_df[existing_cols], missing_cols
+
+def _detect_encoding(file_path):
+    """Checks whether the first 64 KiB of a text file are valid UTF-8, so the file is parsed only once.
+    Anything else is read as latin-1, like the previous fallback."""
+    with open(file_path, 'rb') as f:
+        sample = f.read(65536)
+    try:
+        # The incremental decoder accepts a multi-byte character cut off at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+def _read_text_file(file_path, name, sep, read_args, messages):
+    """Reads a CSV/TXT file in its detected encoding, falling back to latin-1 when UTF-8 decoding
+    fails past the sample. Returns (data_df, missing_cols)."""
+    encoding = _detect_encoding(file_path)
+    if encoding != 'utf-8':
+        messages.append(f"  - WARNING: {name} is not UTF-8 encoded. Reading it with latin-1 encoding.\n")
+    try:
+        return _read_text_columns(file_path, encoding, sep, *read_args)
+    except UnicodeDecodeError:
+        messages.append(f"  - WARNING: UTF-8 decoding failed for {name}. Trying with latin-1 encoding.\n")
+        return _read_text_columns(file_path, 'latin-1', sep, *read_args)
+
+def _read_xlsx(file_path, basename, settings, messages):
+    cache_path = None
+    if settings['enable_parquet_cache']:
+        # The cache is shared with combine_core. This app names columns differently (unique 'nan', 'SKU.1'...),
+        # so its own tag in the read settings keeps its entries apart from the combine_app ones
+        read_args = ('v4.8', settings['sheet_name'], settings['header_row_index'], settings['data_start_row_index'], settings['columns_to_extract'])
+        cache_path = parquet_cache_path(file_path, read_args, CACHE_DIR)
+        if os.path.exists(cache_path):
+            data_df = read_parquet_cache(cache_path)
+            messages.append("  - Loaded from Parquet cache.\n")
+            return data_df, [col for col in settings['columns_to_extract'] if col not in data_df.columns]
+
+    data_df, missing_cols = _read_excel_sheet(file_path, settings['sheet_name'], settings['header_row_index'], settings['data_start_row_index'], settings['columns_to_extract'])
+
+    if cache_path and data_df is not None:
+        try:
+            write_parquet_cache(data_df, cache_path)
+        except Exception as e:
+            messages.append(f"  - WARNING: Could not cache the file as Parquet: {e}\n")
+    return data_df, missing_cols
+
+def _text_read_args(settings):
+    return (settings['header_row_index'], settings['data_start_row_index'], settings['columns_to_extract'], settings['fast_io'])
+
+def _read_csv(file_path, basename, settings, messages):
+    return _read_text_file(file_path, basename, ',', _text_read_args(settings), messages)
+
+def _read_txt(file_path, basename, settings, messages):
+    return _read_text_file(file_path, basename, settings['input_txt_delimiter'], _text_read_args(settings), messages)
+
+# File extension -> kind, and kind -> reader returning (data_df, missing_cols)
+_FILE_KINDS = {'.xlsx': 'xlsx', '.xlsm': 'xlsx', '.csv': 'csv', '.txt': 'txt'}
+_READERS = {'xlsx': _read_xlsx, 'csv': _read_csv, 'txt': _read_txt}
+
+def _read_one(file_path, settings):
+    """
+    Reads and filters a single source file. Runs in a worker thread, so log messages
+    are collected and returned instead of being sent to the GUI directly.
+    Returns (file name, data_df or None, log_messages).
+    """
+    messages = []
+    basename = os.path.basename(file_path)
+    try:
+        kind = _FILE_KINDS[os.path.splitext(file_path)[1].lower()]
+        data_df, missing_cols = _READERS[kind](file_path, basename, settings, messages)
+
+        if data_df is None:
+            messages.append(f"  - WARNING: Not enough rows in the file or failed to read. Skipping.\n")
+            return basename, None, messages
+        if missing_cols:
+            messages.append(f"  - WARNING: Missing columns: {', '.join(missing_cols)}\n")
+        if settings['columns_to_extract'] and data_df.columns.empty:
+            messages.append("  - WARNING: None of the specified columns were found. Skipping file.\n")
+            return basename, None, messages
+
+        messages.append(f"  - Successfully extracted {len(data_df)} rows.\n")
+        return basename, data_df, messages
+
+    except Exception as e:
+        messages.append(f"  - ERROR while processing file: {e}\n")
+        return basename, None, messages
+
 def process_files(settings, log_callback):
     """
     Core logic to process files, with robust encoding and duplicate column handling.
     """
     input_folder = settings['input_folder']
-    header_row_index = settings['header_row'] - 1
-    data_start_row_index = settings['data_start_row'] - 1
-    columns_to_extract = [col.strip() for col in settings['columns_to_extract'].split(',') if col.strip()]
-    input_txt_delimiter = settings.get('txt_delimiter', '\t').encode().decode('unicode_escape')
+    fast_io = settings.get('fast_io', False)
+    read_settings = {
+        'sheet_name': settings['sheet_name'],
+        'header_row_index': settings['header_row'] - 1,
+        'data_start_row_index': settings['data_start_row'] - 1,
+        'columns_to_extract': [col.strip() for col in settings['columns_to_extract'].split(',') if col.strip()],
+        'input_txt_delimiter': settings.get('txt_delimiter', '\t').encode().decode('unicode_escape'),
+        'fast_io': fast_io,
+        'enable_parquet_cache': settings.get('enable_parquet_cache', False) and pyarrow is not None,
+    }
 
     log_callback(f"--- Starting to process files in folder: {input_folder} ---\n")
     
@@ -78,6 +424,12 @@ def process_files(settings, log_callback):
     if settings.get('enable_txt_processing'):
         file_patterns.append("*.txt")
         log_callback("Input TXT file processing is enabled.\n")
+    if fast_io and pyarrow is None:
+        log_callback("WARNING: Fast I/O is enabled but pyarrow is not installed. Using the standard parser and CSV writer.\n")
+    if settings.get('enable_parquet_cache') and pyarrow is None:
+        log_callback("WARNING: Parquet cache is enabled but pyarrow is not installed. Caching is disabled.\n")
+    if read_settings['enable_parquet_cache']:
+        os.makedirs(CACHE_DIR, exist_ok=True)
 
     all_files = []
     for pattern in file_patterns:
@@ -88,62 +440,41 @@ def process_files(settings, log_callback):
         return
 
     log_callback(f"Found {len(all_files)} files to process.\n")
-    all_data_frames = []
-
-    for i, file_path in enumerate(all_files, 1):
-        log_callback(f"\n[{i}/{len(all_files)}] -> Processing file: {os.path.basename(file_path)}\n")
-        try:
-            df_full = None
-            if file_path.endswith(('.xlsx', '.xlsm')):
-                df_full = pd.read_excel(file_path, sheet_name=settings['sheet_name'], header=None)
-            else: 
-                try:
-                    if file_path.endswith('.csv'):
-                        df_full = pd.read_csv(file_path, header=None, on_bad_lines='skip', encoding='utf-8')
-                    elif file_path.endswith('.txt'):
-                        df_full = pd.read_csv(file_path, header=None, on_bad_lines='skip', encoding='utf-8', sep=input_txt_delimiter, engine='python')
-                except UnicodeDecodeError:
-                    log_callback(f"  - WARNING: UTF-8 decoding failed for {os.path.basename(file_path)}. Trying with latin-1 encoding.\n")
-                    if file_path.endswith('.csv'):
-                        df_full = pd.read_csv(file_path, header=None, on_bad_lines='skip', encoding='latin-1')
-                    elif file_path.endswith('.txt'):
-                        df_full = pd.read_csv(file_path, header=None, on_bad_lines='skip', encoding='latin-1', sep=input_txt_delimiter, engine='python')
-
-            if df_full is None or len(df_full) < data_start_row_index:
-                log_callback(f"  - WARNING: Not enough rows in the file or failed to read. Skipping.\n")
-                continue
-
-            column_names = df_full.iloc[header_row_index]
-            unique_column_names = _make_columns_unique(column_names)
-            data_df = df_full.iloc[data_start_row_index:].copy()
-            data_df.columns = unique_column_names
-            data_df.reset_index(drop=True, inplace=True)
-            
-            if columns_to_extract:
-                data_df.columns = data_df.columns.astype(str)
-                existing_cols = [col for col in columns_to_extract if col in data_df.columns]
-                missing_cols = [col for col in columns_to_extract if col not in data_df.columns]
-                
-                if missing_cols:
-                    log_callback(f"  - WARNING: Missing columns: {', '.join(missing_cols)}\n")
-                if not existing_cols:
-                    log_callback("  - WARNING: None of the specified columns were found. Skipping file.\n")
-                    continue
-                data_df = data_df[existing_cols]
-
-            data_df['source_file'] = os.path.basename(file_path)
-            all_data_frames.append(data_df)
-            log_callback(f"  - Successfully extracted {len(data_df)} rows.\n")
 
-        except Exception as e:
-            log_callback(f"  - ERROR while processing file: {e}\n")
+    # File reads are I/O-bound and pandas releases the GIL while parsing, so read concurrently.
+    # Results are kept in file order so the combined output does not depend on completion order.
+    results = [None] * len(all_files)
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_read_one, file_path, read_settings): index for index, file_path in enumerate(all_files)}
+        for i, future in enumerate(as_completed(futures), 1):
+            basename, data_df, messages = future.result()
+            # One log call per file keeps GUI updates to a minimum
+            log_callback(f"\n[{i}/{len(all_files)}] -> Processing file: {basename}\n" + "".join(messages))
+            if data_df is not None:
+                results[futures[future]] = (basename, data_df)
+
+    # (source file name, frame) pairs; the source_file column is added once after combining
+    all_data_frames = [result for result in results if result is not None]
 
     if not all_data_frames:
         log_callback("\nCould not extract data from any file.\n")
         return
 
     log_callback("\n--- Combining all data... ---\n")
-    final_df = pd.concat(all_data_frames, ignore_index=True)
+    final_df = _concat_frames([data_df for _, data_df in all_data_frames])
+    source_names = np.array([name for name, _ in all_data_frames], dtype=object)
+    source_lengths = np.array([len(data_df) for _, data_df in all_data_frames], dtype=np.int64)
+    # pd.concat of frames that each ended in source_file put it right after the first frame's columns,
+    # ahead of the columns only later files have; a source_file column read from a file is replaced
+    first_columns = all_data_frames[0][1].columns
+    source_position = first_columns.get_loc('source_file') if 'source_file' in first_columns else len(first_columns)
+    if 'source_file' in final_df.columns:
+        del final_df['source_file']
+    final_df.insert(source_position, 'source_file', np.repeat(source_names, source_lengths))
+    # Drop every reference to the per-file frames (the finished futures still hold their results)
+    # so their memory is freed before the merge and save instead of when the function returns
+    del all_data_frames, results, futures, data_df
     log_callback(f"Combined data has {len(final_df)} rows.\n")
 
     # --- Merge Logic ---
@@ -156,46 +487,66 @@ def process_files(settings, log_callback):
             cols_to_add = [col.strip() for col in settings['lookup_columns_to_add'].split(',') if col.strip()]
             lookup_header_row_index = settings['lookup_header_row'] - 1
             lookup_data_start_row_index = settings['lookup_data_start_row'] - 1
+            lookup_is_txt = settings.get('enable_lookup_txt') and lookup_file.endswith('.txt')
+            lookup_txt_delimiter = settings.get('lookup_txt_delimiter', '\t').encode().decode('unicode_escape')
 
             log_callback(f"Reading lookup file: {lookup_file}\n")
-            lookup_df_full = None
-            try:
-                if settings.get('enable_lookup_txt') and lookup_file.endswith('.txt'):
-                    lookup_txt_delimiter = settings.get('lookup_txt_delimiter', '\t').encode().decode('unicode_escape')
-                    lookup_df_full = pd.read_csv(lookup_file, sep=lookup_txt_delimiter, engine='python', encoding='utf-8', header=None)
-                elif lookup_file.endswith('.csv'):
-                    lookup_df_full = pd.read_csv(lookup_file, encoding='utf-8', header=None)
-                else:
-                    lookup_df_full = pd.read_excel(lookup_file, header=None)
-            except UnicodeDecodeError:
-                log_callback("  - WARNING: UTF-8 decoding failed for lookup file. Trying with latin-1 encoding.\n")
-                if settings.get('enable_lookup_txt') and lookup_file.endswith('.txt'):
-                    lookup_txt_delimiter = settings.get('lookup_txt_delimiter', '\t').encode().decode('unicode_escape')
-                    lookup_df_full = pd.read_csv(lookup_file, sep=lookup_txt_delimiter, engine='python', encoding='latin-1', header=None)
-                elif lookup_file.endswith('.csv'):
-                    lookup_df_full = pd.read_csv(lookup_file, encoding='latin-1', header=None)
-            
-            lookup_column_names = lookup_df_full.iloc[lookup_header_row_index]
-            unique_lookup_column_names = _make_columns_unique(lookup_column_names)
-            lookup_df = lookup_df_full.iloc[lookup_data_start_row_index:].copy()
-            lookup_df.columns = unique_lookup_column_names
-            lookup_df.reset_index(drop=True, inplace=True)
+            # Ensure the lookup key is in the subset, and remove duplicates from cols_to_add
+            columns_for_subset = [lookup_key] + [col for col in cols_to_add if col != lookup_key]
+
+            lookup_args = (lookup_header_row_index, lookup_data_start_row_index, columns_for_subset, fast_io)
+            if lookup_is_txt or lookup_file.endswith('.csv'):
+                lookup_messages = []
+                lookup_sep = lookup_txt_delimiter if lookup_is_txt else ','
+                lookup_df, _ = _read_text_file(lookup_file, "lookup file", lookup_sep, lookup_args, lookup_messages)
+                if lookup_messages:
+                    log_callback("".join(lookup_messages))
+            else:
+                # Read the header first so only the needed columns are parsed; dtype=object keeps
+                # cell values as stored, like the previous header=None read. Both reads share one
+                # open workbook, so the zip archive is not opened and indexed twice.
+                with pd.ExcelFile(lookup_file, engine='openpyxl') as lookup_xl:
+                    header = lookup_xl.parse(header=lookup_header_row_index, nrows=0)
+                    lookup_column_names = _make_columns_unique(_restore_empty_names(header.columns))
+                    subset_cols = set(columns_for_subset)
+                    positions = [i for i, col in enumerate(lookup_column_names) if col in subset_cols]
+                    lookup_df = lookup_xl.parse(header=lookup_header_row_index, usecols=positions, dtype=object)
+                lookup_df.columns = [lookup_column_names[i] for i in positions]
+                lookup_df = _skip_to_data_rows(lookup_df, lookup_header_row_index, lookup_data_start_row_index)
 
             final_df[source_key] = final_df[source_key].astype(str)
             lookup_df[lookup_key] = lookup_df[lookup_key].astype(str)
 
             # NEW: Smarter merge logic
-            # Ensure the lookup key is in the subset, and remove duplicates from cols_to_add
-            columns_for_subset = [lookup_key] + [col for col in cols_to_add if col != lookup_key]
             lookup_subset = lookup_df[columns_for_subset]
 
-            final_df = pd.merge(final_df, lookup_subset, left_on=source_key, right_on=lookup_key, how='left')
-            
-            # Drop the lookup key ONLY if it has a different name than the source key
-            # AND it was NOT explicitly requested in the columns to add.
-            if source_key != lookup_key and lookup_key not in cols_to_add:
-                final_df = final_df.drop(columns=[lookup_key])
+            # A unique lookup key cannot multiply rows, so each column can be looked up with map()
+            # instead of a full join. Name clashes still go through pd.merge to keep its suffixes.
+            added_cols = columns_for_subset[1:]
+            new_cols = added_cols + ([lookup_key] if source_key != lookup_key else [])
+            if lookup_subset[lookup_key].is_unique and not any(col in final_df.columns for col in new_cols):
+                lookup_indexed = lookup_subset.set_index(lookup_key)
+                # Keep the lookup key under its own name only if it was explicitly requested
+                if source_key != lookup_key and lookup_key in cols_to_add:
+                    final_df[lookup_key] = final_df[source_key].where(final_df[source_key].isin(lookup_indexed.index))
+                for col in added_cols:
+                    final_df[col] = final_df[source_key].map(lookup_indexed[col])
+            else:
+                # With shared categories both keys become integer codes, which are cheaper to hash and compare.
+                # Only the join uses them: map() on a categorical key returns float64, turning 5 into 5.0
+                key_categories = pd.api.types.union_categoricals([pd.Categorical(final_df[source_key]), pd.Categorical(lookup_df[lookup_key])]).categories
+                final_df[source_key] = pd.Categorical(final_df[source_key], categories=key_categories)
+                lookup_df[lookup_key] = pd.Categorical(lookup_df[lookup_key], categories=key_categories)
+                lookup_subset = lookup_df[columns_for_subset]
+                final_df = pd.merge(final_df, lookup_subset, left_on=source_key, right_on=lookup_key, how='left')
+                
+                # Drop the lookup key ONLY if it has a different name than the source key
+                # AND it was NOT explicitly requested in the columns to add.
+                if source_key != lookup_key and lookup_key not in cols_to_add:
+                    final_df = final_df.drop(columns=[lookup_key])
             
+            # The lookup data is not needed anymore; release it before the report is written
+            lookup_df = lookup_subset = lookup_indexed = None
             log_callback("Merge successful.\n")
 
         except Exception as e:
@@ -210,9 +561,9 @@ def process_files(settings, log_callback):
 
     try:
         if output_format == 'xlsx':
-            final_df.to_excel(full_output_path, index=False)
+            _write_xlsx(final_df, full_output_path)
         else: # Default to CSV
-            final_df.to_csv(full_output_path, index=False, encoding='utf-8-sig')
+            _write_csv(final_df, full_output_path, fast_io=fast_io)
         
         log_callback(f"\n🎉 Done! All data has been combined into file: {full_output_path}\n")
         log_callback(f"Total rows processed: {len(final_df)}\n")
@@ -240,6 +591,8 @@ class SettingsWindow(tk.Toplevel):
         self.merge_enabled_var = tk.BooleanVar(value=self.settings.get('enable_merge', False))
         self.txt_enabled_var = tk.BooleanVar(value=self.settings.get('enable_txt_processing', False))
         self.lookup_txt_enabled_var = tk.BooleanVar(value=self.settings.get('enable_lookup_txt', False))
+        self.fast_io_var = tk.BooleanVar(value=self.settings.get('fast_io', False))
+        self.parquet_cache_var = tk.BooleanVar(value=self.settings.get('enable_parquet_cache', False))
 
         main_frame = ttk.Frame(self)
         main_frame.pack(fill="both", expand=True)
@@ -282,6 +635,9 @@ class SettingsWindow(tk.Toplevel):
         ttk.Label(input_frame, text="Columns to extract (comma-separated):").grid(row=6, column=0, padx=10, pady=5, sticky="w")
         self.entries['columns_to_extract'] = ttk.Entry(input_frame)
         self.entries['columns_to_extract'].grid(row=6, column=1, padx=10, pady=5, sticky="ew")
+
+        ttk.Checkbutton(input_frame, text="Fast I/O (use pyarrow for CSV/TXT files and CSV reports if installed; quotes all text values)", variable=self.fast_io_var).grid(row=7, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        ttk.Checkbutton(input_frame, text="Cache Excel files as Parquet for faster re-runs (requires pyarrow)", variable=self.parquet_cache_var).grid(row=8, column=0, columnspan=2, padx=10, pady=5, sticky="w")
         input_frame.columnconfigure(1, weight=1)
 
         # --- Merge Settings ---
@@ -389,6 +745,8 @@ class SettingsWindow(tk.Toplevel):
         self.settings['enable_merge'] = self.merge_enabled_var.get()
         self.settings['enable_txt_processing'] = self.txt_enabled_var.get()
         self.settings['enable_lookup_txt'] = self.lookup_txt_enabled_var.get()
+        self.settings['fast_io'] = self.fast_io_var.get()
+        self.settings['enable_parquet_cache'] = self.parquet_cache_var.get()
 
         for key in ["header_row", "data_start_row", "lookup_header_row", "lookup_data_start_row"]:
             try:
@@ -427,14 +785,31 @@ class App(tk.Tk):
         self.log_area = scrolledtext.ScrolledText(self, wrap=tk.WORD, state='disabled')
         self.log_area.pack(pady=10, padx=10, expand=True, fill="both")
 
+        # Messages from the processing thread wait in a queue and are shown about 10 times a second
+        self._log_queue = queue.Queue()
+        self.after(100, self._drain_log)
+
     def open_settings(self):
         SettingsWindow(self)
 
     def log(self, message):
-        self.log_area.configure(state='normal')
-        self.log_area.insert(tk.END, message)
-        self.log_area.configure(state='disabled')
-        self.log_area.see(tk.END)
+        """Thread-safe logging: the message is queued, and only the Tk main loop touches the widget."""
+        self._log_queue.put(message)
+
+    def _drain_log(self):
+        """Inserts the queued messages into the log area in one update and schedules itself again."""
+        messages = []
+        try:
+            while len(messages) < 200:
+                messages.append(self._log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if messages:
+            self.log_area.configure(state='normal')
+            self.log_area.insert(tk.END, "".join(messages))
+            self.log_area.configure(state='disabled')
+            self.log_area.see(tk.END)
+        self.after(100, self._drain_log)
 
     def start_processing_thread(self):
         self.start_btn.config(state="disabled")
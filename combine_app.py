@@ -1,21 +1,57 @@
-import pandas as pd
 import os
-import glob
 import json
 import threading
+import queue
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+from combine_core import process_excel_files, preload_modules
+
 # --- КОНФИГУРАЦИЯ ---
 CONFIG_FILE = 'config.json'
 
+# --- Тексты сообщений ---
+# Сообщения лога для combine_core.process_excel_files; значения в {} подставляются при выводе
+MESSAGES = {
+    "start": "--- Начинаю обработку файлов в папке: {folder} ---\n",
+    "no_files": "ОШИБКА: В указанной папке не найдено .xlsx или .xlsm файлов.\n",
+    "found": "Найдено файлов для обработки: {count}\n",
+    "processing": "\n[{index}/{count}] -> Обрабатываю файл: {name}\n",
+    "not_enough_rows": "  - ПРЕДУПРЕЖДЕНИЕ: В файле недостаточно строк. Пропускаю.\n",
+    "missing_columns": "  - ПРЕДУПРЕЖДЕНИЕ: Отсутствуют колонки: {columns}\n",
+    "no_columns": "  - ПРЕДУПРЕЖДЕНИЕ: Ни одна из нужных колонок не найдена. Пропускаю.\n",
+    "from_cache": "  - Прочитано из кэша.\n",
+    "cache_not_saved": "  - ПРЕДУПРЕЖДЕНИЕ: Не удалось сохранить кэш файла: {error}\n",
+    "cache_unavailable": "ПРЕДУПРЕЖДЕНИЕ: Кэш Parquet включен, но pyarrow не установлен. Кэш отключен.\n",
+    "fast_io_unavailable": "ПРЕДУПРЕЖДЕНИЕ: Быстрая запись включена, но pyarrow не установлен. CSV записывается обычным способом.\n",
+    "extracted": "  - Успешно извлечено {rows} строк.\n",
+    "file_error": "  - ОШИБКА при обработке файла: {error}\n",
+    "columns_skipped": "  - ПРЕДУПРЕЖДЕНИЕ: Колонки, для которых нет места в итоговом файле, не записываются: {columns}\n",
+    "nothing_extracted": "\nНе удалось извлечь данные ни из одного файла.\n",
+    "combining": "\n--- Объединяю все данные... ---\n",
+    "done": "\n🎉 Готово! Все данные объединены в файл: {output_file}\n",
+    "total_rows": "Всего обработано строк: {rows}\n"
+}
+
 # --- Управление настройками ---
 
+# Прочитанный config.json и время его изменения, см. load_settings()
+_settings_cache = None
+_settings_mtime = None
+
 def load_settings():
-    """Загружает настройки из файла JSON. Если файла нет, возвращает значения по умолчанию."""
+    """
+    Загружает настройки из файла JSON. Если файла нет, возвращает значения по умолчанию.
+    Прочитанный файл хранится в памяти и перечитывается, только если изменилось время его изменения.
+    """
+    global _settings_cache, _settings_mtime
     try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        if _settings_cache is not None and mtime == _settings_mtime:
+            return dict(_settings_cache)  # Копия, чтобы вызывающий код мог ее менять
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            settings = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         # Значения по умолчанию
         return {
@@ -24,84 +60,21 @@ def load_settings():
             "header_row": 5,
             "data_start_row": 7,
             "columns_to_extract": "Артикул, Цена, Количество",
-            "output_file": "combined_data.csv"
+            "output_file": "combined_data.csv",
+            "fast_io": False,
+            "enable_parquet_cache": False
         }
 
+    _settings_cache, _settings_mtime = settings, mtime
+    return dict(settings)
+
 def save_settings(settings):
     """Сохраняет настройки в файл JSON."""
+    global _settings_cache, _settings_mtime
     with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
         json.dump(settings, f, indent=4)
-
-# --- Основная логика обработки файлов ---
-
-def process_excel_files(settings, log_callback):
-    """
-    Основная логика обработки файлов. Теперь принимает настройки и функцию для логирования.
-    """
-    folder_path = settings['folder_path']
-    sheet_name = settings['sheet_name']
-    header_row = settings['header_row'] - 1  # Pandas-индексация с 0
-    data_start_row = settings['data_start_row'] - 1  # Pandas-индексация с 0
-    columns_to_extract = [col.strip() for col in settings['columns_to_extract'].split(',') if col.strip()]
-    output_file = settings['output_file']
-
-    log_callback(f"--- Начинаю обработку файлов в папке: {folder_path} ---\n")
-    
-    # Сначала ищем .xlsm, если не нашли - ищем .xlsx
-    excel_files = glob.glob(os.path.join(folder_path, "*.xlsm"))
-    if not excel_files:
-        excel_files = glob.glob(os.path.join(folder_path, "*.xlsx"))
-
-    if not excel_files:
-        log_callback("ОШИБКА: В указанной папке не найдено .xlsx или .xlsm файлов.\n")
-        return
-
-    log_callback(f"Найдено файлов для обработки: {len(excel_files)}\n")
-    all_data_frames = []
-
-    for i, file in enumerate(excel_files, 1):
-        log_callback(f"\n[{i}/{len(excel_files)}] -> Обрабатываю файл: {os.path.basename(file)}\n")
-        try:
-            df = pd.read_excel(file, sheet_name=sheet_name, header=None)
-
-            if len(df) < data_start_row:
-                log_callback(f"  - ПРЕДУПРЕЖДЕНИЕ: В файле недостаточно строк. Пропускаю.\n")
-                continue
-
-            column_names = df.iloc[header_row]
-            data_df = df.iloc[data_start_row:].copy()
-            data_df.columns = column_names
-            data_df.reset_index(drop=True, inplace=True)
-            
-            if columns_to_extract:
-                existing_cols = [col for col in columns_to_extract if col in data_df.columns]
-                missing_cols = [col for col in columns_to_extract if col not in data_df.columns]
-                if missing_cols:
-                    log_callback(f"  - ПРЕДУПРЕЖДЕНИЕ: Отсутствуют колонки: {', '.join(missing_cols)}\n")
-                if not existing_cols:
-                    log_callback("  - ПРЕДУПРЕЖДЕНИЕ: Ни одна из нужных колонок не найдена. Пропускаю.\n")
-                    continue
-                data_df = data_df[existing_cols]
-
-            data_df['source_file'] = os.path.basename(file)
-            all_data_frames.append(data_df)
-            log_callback(f"  - Успешно извлечено {len(data_df)} строк.\n")
-
-        except Exception as e:
-            log_callback(f"  - ОШИБКА при обработке файла: {e}\n")
-
-    if not all_data_frames:
-        log_callback("\nНе удалось извлечь данные ни из одного файла.\n")
-        return
-
-    log_callback("\n--- Объединяю все данные... ---\n")
-    final_df = pd.concat(all_data_frames, ignore_index=True)
-    final_df.to_csv(output_file, index=False, encoding='utf-8-sig')
-    
-    log_callback(f"\n🎉 Готово! Все данные объединены в файл: {output_file}\n")
-    log_callback(f"Всего обработано строк: {len(final_df)}\n")
-    messagebox.showinfo("Готово", f"Обработка завершена! Результат в файле {output_file}")
-
+    # Теперь файл совпадает с этими настройками, и следующий load_settings() может его не читать
+    _settings_cache, _settings_mtime = dict(settings), os.stat(CONFIG_FILE).st_mtime_ns
 
 # --- Графический интерфейс (GUI) ---
 
@@ -114,7 +87,7 @@ class SettingsWindow(tk.Toplevel):
         self.grab_set()
 
         self.title("Настройки")
-        self.geometry("500x300")
+        self.geometry("500x360")
         self.parent = parent
         self.settings = load_settings()
 
@@ -142,9 +115,15 @@ class SettingsWindow(tk.Toplevel):
         browse_btn = ttk.Button(self, text="Обзор...", command=self.browse_folder)
         browse_btn.grid(row=0, column=2, padx=5, pady=5)
 
+        # Флажки быстрой записи CSV и кэша Parquet
+        self.fast_io_var = tk.BooleanVar(value=self.settings.get('fast_io', False))
+        ttk.Checkbutton(self, text="Быстрая запись CSV через pyarrow (если установлен; все значения в кавычках)", variable=self.fast_io_var).grid(row=len(fields), column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        self.parquet_cache_var = tk.BooleanVar(value=self.settings.get('enable_parquet_cache', False))
+        ttk.Checkbutton(self, text="Кэшировать Excel-файлы в Parquet для быстрых повторных запусков (нужен pyarrow)", variable=self.parquet_cache_var).grid(row=len(fields) + 1, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
         # Кнопка сохранения
         save_btn = ttk.Button(self, text="Сохранить", command=self.save_and_close)
-        save_btn.grid(row=len(fields), column=1, pady=20)
+        save_btn.grid(row=len(fields) + 2, column=1, pady=20)
         
         self.columnconfigure(1, weight=1)
 
@@ -165,6 +144,8 @@ class SettingsWindow(tk.Toplevel):
                     return
             else:
                 self.settings[key] = entry.get()
+        self.settings['fast_io'] = self.fast_io_var.get()
+        self.settings['enable_parquet_cache'] = self.parquet_cache_var.get()
         save_settings(self.settings)
         messagebox.showinfo("Сохранено", "Настройки успешно сохранены.")
         self.destroy()
@@ -190,15 +171,35 @@ class App(tk.Tk):
         self.log_area = scrolledtext.ScrolledText(self, wrap=tk.WORD, state='disabled')
         self.log_area.pack(pady=10, padx=10, expand=True, fill="both")
 
+        # Сообщения из рабочего потока копятся в очереди и выводятся примерно 10 раз в секунду
+        self._log_queue = queue.Queue()
+        self.after(100, self._drain_log)
+
+        # Тяжелые модули загружаются в фоне, пока окно уже открыто
+        self._import_thread = threading.Thread(target=preload_modules, daemon=True)
+        self._import_thread.start()
+
     def open_settings(self):
         SettingsWindow(self)
 
     def log(self, message):
-        """Безопасный вывод сообщений в текстовое поле из любого потока."""
-        self.log_area.configure(state='normal')
-        self.log_area.insert(tk.END, message)
-        self.log_area.configure(state='disabled')
-        self.log_area.see(tk.END) # Автопрокрутка вниз
+        """Безопасный вывод сообщений в текстовое поле из любого потока: сообщение ставится в очередь."""
+        self._log_queue.put(message)
+
+    def _drain_log(self):
+        """Выводит накопленные сообщения в текстовое поле за одно обновление и планирует себя снова."""
+        messages = []
+        try:
+            while len(messages) < 200:
+                messages.append(self._log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if messages:
+            self.log_area.configure(state='normal')
+            self.log_area.insert(tk.END, "".join(messages))
+            self.log_area.configure(state='disabled')
+            self.log_area.see(tk.END) # Автопрокрутка вниз
+        self.after(100, self._drain_log)
 
     def start_processing_thread(self):
         """Запускает обработку в отдельном потоке, чтобы интерфейс не зависал."""
@@ -220,7 +221,11 @@ class App(tk.Tk):
                 messagebox.showerror("Ошибка", "Путь к папке не указан. Зайдите в Настройки и выберите папку.")
                 return
 
-            process_excel_files(settings, self.log)
+            # Обработке нужны модули из фоновой загрузки; обычно к нажатию "Старт" она уже закончилась
+            self._import_thread.join()
+            if process_excel_files(settings, self.log, MESSAGES):
+                output_file = settings['output_file']
+                messagebox.showinfo("Готово", f"Обработка завершена! Результат в файле {output_file}")
         except Exception as e:
             self.log(f"КРИТИЧЕСКАЯ ОШИБКА: {e}\n")
             messagebox.showerror("Критическая ошибка", str(e))
@@ -229,5 +234,6 @@ class App(tk.Tk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Нужно для дочерних процессов в собранном (PyInstaller) exe
     app = App()
     app.mainloop()
\ No newline at end of file
@@ -1,21 +1,57 @@
-import pandas as pd
 import os
-import glob
 import json
 import threading
+import queue
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+from combine_core import process_excel_files, preload_modules
+
 # --- CONFIGURATION ---
 CONFIG_FILE = 'config.json'
 
+# --- Messages ---
+# Log messages for combine_core.process_excel_files; the values in {} are filled in when logging
+MESSAGES = {
+    "start": "--- Starting to process files in folder: {folder} ---\n",
+    "no_files": "ERROR: No .xlsx or .xlsm files found in the specified folder.\n",
+    "found": "Found {count} files to process.\n",
+    "processing": "\n[{index}/{count}] -> Processing file: {name}\n",
+    "not_enough_rows": "  - WARNING: Not enough rows in the file to extract data. Skipping.\n",
+    "missing_columns": "  - WARNING: These columns are missing in this file: {columns}\n",
+    "no_columns": "  - WARNING: None of the specified columns were found. Skipping file.\n",
+    "from_cache": "  - Loaded from cache.\n",
+    "cache_not_saved": "  - WARNING: Could not cache the file: {error}\n",
+    "cache_unavailable": "WARNING: Parquet cache is enabled but pyarrow is not installed. Caching is disabled.\n",
+    "fast_io_unavailable": "WARNING: Fast I/O is enabled but pyarrow is not installed. Using the standard CSV writer.\n",
+    "extracted": "  - Successfully extracted {rows} rows.\n",
+    "file_error": "  - ERROR while processing file: {error}\n",
+    "columns_skipped": "  - WARNING: Columns that have no place in the output file are not written: {columns}\n",
+    "nothing_extracted": "\nCould not extract data from any file.\n",
+    "combining": "\n--- Combining all data... ---\n",
+    "done": "\n🎉 Done! All data has been combined into file: {output_file}\n",
+    "total_rows": "Total rows processed: {rows}\n"
+}
+
 # --- Settings Management ---
 
+# Parsed config.json and its modification time, see load_settings()
+_settings_cache = None
+_settings_mtime = None
+
 def load_settings():
-    """Loads settings from a JSON file. Returns default values if the file doesn't exist."""
+    """
+    Loads settings from a JSON file. Returns default values if the file doesn't exist.
+    The parsed file is kept in memory and only re-read when its modification time changes.
+    """
+    global _settings_cache, _settings_mtime
     try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        if _settings_cache is not None and mtime == _settings_mtime:
+            return dict(_settings_cache)  # A copy, so callers can change it freely
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            settings = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         # Default values
         return {
@@ -24,83 +60,21 @@ def load_settings():
             "header_row": 5,
             "data_start_row": 7,
             "columns_to_extract": "SKU, Price, Quantity",
-            "output_file": "combined_data.csv"
+            "output_file": "combined_data.csv",
+            "fast_io": False,
+            "enable_parquet_cache": False
         }
 
+    _settings_cache, _settings_mtime = settings, mtime
+    return dict(settings)
+
 def save_settings(settings):
     """Saves settings to a JSON file."""
+    global _settings_cache, _settings_mtime
     with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
         json.dump(settings, f, indent=4)
-
-# --- Core File Processing Logic ---
-
-def process_excel_files(settings, log_callback):
-    """
-    Core logic to process files. Now accepts settings and a logging callback function.
-    """
-    folder_path = settings['folder_path']
-    sheet_name = settings['sheet_name']
-    header_row = settings['header_row'] - 1  # Pandas is 0-indexed
-    data_start_row = settings['data_start_row'] - 1  # Pandas is 0-indexed
-    columns_to_extract = [col.strip() for col in settings['columns_to_extract'].split(',') if col.strip()]
-    output_file = settings['output_file']
-
-    log_callback(f"--- Starting to process files in folder: {folder_path} ---\n")
-    
-    excel_files = glob.glob(os.path.join(folder_path, "*.xlsm"))
-    if not excel_files:
-        excel_files = glob.glob(os.path.join(folder_path, "*.xlsx"))
-
-    if not excel_files:
-        log_callback("ERROR: No .xlsx or .xlsm files found in the specified folder.\n")
-        return
-
-    log_callback(f"Found {len(excel_files)} files to process.\n")
-    all_data_frames = []
-
-    for i, file in enumerate(excel_files, 1):
-        log_callback(f"\n[{i}/{len(excel_files)}] -> Processing file: {os.path.basename(file)}\n")
-        try:
-            df = pd.read_excel(file, sheet_name=sheet_name, header=None)
-
-            if len(df) < data_start_row:
-                log_callback(f"  - WARNING: Not enough rows in the file to extract data. Skipping.\n")
-                continue
-
-            column_names = df.iloc[header_row]
-            data_df = df.iloc[data_start_row:].copy()
-            data_df.columns = column_names
-            data_df.reset_index(drop=True, inplace=True)
-            
-            if columns_to_extract:
-                existing_cols = [col for col in columns_to_extract if col in data_df.columns]
-                missing_cols = [col for col in columns_to_extract if col not in data_df.columns]
-                if missing_cols:
-                    log_callback(f"  - WARNING: These columns are missing in this file: {', '.join(missing_cols)}\n")
-                if not existing_cols:
-                    log_callback("  - WARNING: None of the specified columns were found. Skipping file.\n")
-                    continue
-                data_df = data_df[existing_cols]
-
-            data_df['source_file'] = os.path.basename(file)
-            all_data_frames.append(data_df)
-            log_callback(f"  - Successfully extracted {len(data_df)} rows.\n")
-
-        except Exception as e:
-            log_callback(f"  - ERROR while processing file: {e}\n")
-
-    if not all_data_frames:
-        log_callback("\nCould not extract data from any file.\n")
-        return
-
-    log_callback("\n--- Combining all data... ---\n")
-    final_df = pd.concat(all_data_frames, ignore_index=True)
-    final_df.to_csv(output_file, index=False, encoding='utf-8-sig')
-    
-    log_callback(f"\n🎉 Done! All data has been combined into file: {output_file}\n")
-    log_callback(f"Total rows processed: {len(final_df)}\n")
-    messagebox.showinfo("Done", f"Processing complete! Result saved in {output_file}")
-
+    # The file is known to match these settings now, so the next load_settings() can skip reading it
+    _settings_cache, _settings_mtime = dict(settings), os.stat(CONFIG_FILE).st_mtime_ns
 
 # --- Graphical User Interface (GUI) ---
 
@@ -112,7 +86,7 @@ class SettingsWindow(tk.Toplevel):
         self.grab_set()
 
         self.title("Settings")
-        self.geometry("550x300")
+        self.geometry("550x360")
         self.parent = parent
         self.settings = load_settings()
 
@@ -138,8 +112,13 @@ class SettingsWindow(tk.Toplevel):
         browse_btn = ttk.Button(self, text="Browse...", command=self.browse_folder)
         browse_btn.grid(row=0, column=2, padx=5, pady=5)
 
+        self.fast_io_var = tk.BooleanVar(value=self.settings.get('fast_io', False))
+        ttk.Checkbutton(self, text="Fast CSV writing with pyarrow (if installed; quotes all text values)", variable=self.fast_io_var).grid(row=len(fields), column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        self.parquet_cache_var = tk.BooleanVar(value=self.settings.get('enable_parquet_cache', False))
+        ttk.Checkbutton(self, text="Cache Excel files as Parquet for faster re-runs (requires pyarrow)", variable=self.parquet_cache_var).grid(row=len(fields) + 1, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
         save_btn = ttk.Button(self, text="Save", command=self.save_and_close)
-        save_btn.grid(row=len(fields), column=1, pady=20)
+        save_btn.grid(row=len(fields) + 2, column=1, pady=20)
         
         self.columnconfigure(1, weight=1)
 
@@ -159,6 +138,8 @@ class SettingsWindow(tk.Toplevel):
                     return
             else:
                 self.settings[key] = entry.get()
+        self.settings['fast_io'] = self.fast_io_var.get()
+        self.settings['enable_parquet_cache'] = self.parquet_cache_var.get()
         save_settings(self.settings)
         messagebox.showinfo("Saved", "Settings saved successfully.")
         self.destroy()
@@ -182,14 +163,35 @@ class App(tk.Tk):
         self.log_area = scrolledtext.ScrolledText(self, wrap=tk.WORD, state='disabled')
         self.log_area.pack(pady=10, padx=10, expand=True, fill="both")
 
+        # Messages from the worker thread are queued and written to the widget ~10 times a second
+        self._log_queue = queue.Queue()
+        self.after(100, self._drain_log)
+
+        # The heavy modules are loaded in the background while the window is already open
+        self._import_thread = threading.Thread(target=preload_modules, daemon=True)
+        self._import_thread.start()
+
     def open_settings(self):
         SettingsWindow(self)
 
     def log(self, message):
-        self.log_area.configure(state='normal')
-        self.log_area.insert(tk.END, message)
-        self.log_area.configure(state='disabled')
-        self.log_area.see(tk.END)
+        """Queues a message for the log area. Safe to call from any thread."""
+        self._log_queue.put(message)
+
+    def _drain_log(self):
+        """Writes the queued messages to the log area in one update, then reschedules itself."""
+        messages = []
+        try:
+            while len(messages) < 200:
+                messages.append(self._log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if messages:
+            self.log_area.configure(state='normal')
+            self.log_area.insert(tk.END, "".join(messages))
+            self.log_area.configure(state='disabled')
+            self.log_area.see(tk.END)
+        self.after(100, self._drain_log)
 
     def start_processing_thread(self):
         self.start_btn.config(state="disabled")
@@ -208,7 +210,11 @@ class App(tk.Tk):
                 messagebox.showerror("Error", "Folder path is not specified. Please go to Settings and select a folder.")
                 return
 
-            process_excel_files(settings, self.log)
+            # Processing needs the modules from the background load; it has usually finished by the time Start is pressed
+            self._import_thread.join()
+            if process_excel_files(settings, self.log, MESSAGES):
+                output_file = settings['output_file']
+                messagebox.showinfo("Done", f"Processing complete! Result saved in {output_file}")
         except Exception as e:
             self.log(f"CRITICAL ERROR: {e}\n")
             messagebox.showerror("Critical Error", str(e))
@@ -216,5 +222,6 @@ class App(tk.Tk):
             self.start_btn.config(state="normal")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for worker processes in a frozen (PyInstaller) build
     app = App()
     app.mainloop()
\ No newline at end of file
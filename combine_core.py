@@ -0,0 +1,541 @@
+"""
+Shared logic for combining Excel files into one CSV, used by combine_app.py, combine_app_en.py and combine_excel.py.
+Log texts are passed in as a dictionary, so all three scripts run the same processing code.
+"""
+import os
+import hashlib
+import itertools
+import operator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# pandas, numpy, openpyxl and pyarrow are loaded in _import_modules(), not when this module is imported:
+# importing them takes noticeable time, and the GUI window should appear right away
+pd = np = pyarrow = None
+load_workbook = None
+
+def _import_modules():
+    """
+    Imports pandas, numpy, openpyxl and pyarrow unless that is already done. The GUI loads them in a background
+    thread at startup (see preload_modules) while the user looks at the settings; worker processes load them before reading a file.
+    The imports are written the usual way so PyInstaller finds these modules when building the exe.
+    """
+    global pd, np, pyarrow, load_workbook
+    if pd is not None:
+        return
+    import numpy as np
+    from openpyxl import load_workbook
+    try:
+        import pyarrow  # Optional: writes the CSV with Arrow's fast C++ writer
+        import pyarrow.csv
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        pyarrow = None
+    # pd is assigned last: once it is set, the other modules are loaded too
+    import pandas as pd
+
+def preload_modules():
+    """
+    Loads the modules ahead of time; the GUI calls this in a background thread at startup.
+    An import error is not shown here, it surfaces when processing starts.
+    """
+    try:
+        _import_modules()
+    except ImportError:
+        pass
+
+# Folder in the working directory where already read sheets are kept as Parquet when enable_parquet_cache
+# is on in the settings (requires pyarrow). Same folder as Excel_CSVCombinerApp_v4_8.py uses
+CACHE_DIR = '.combiner_cache'
+
+# --- Core File Processing Logic ---
+
+def _write_csv_rows(data_df, csv_fh, write_header, fast_io=False):
+    """
+    Appends the table to the binary output file. With fast_io and pyarrow every cell is first turned
+    into a string with str(), as to_csv does for such columns, and written by Arrow's C++ writer.
+    That file looks different (every string is quoted), so to_csv writes it by default, as before.
+    """
+    if not fast_io or pyarrow is None:
+        data_df.to_csv(csv_fh, index=False, header=write_header, encoding='utf-8')
+        return
+    arrays = []
+    # By position, not by name: with repeated header names data_df[col] would return a DataFrame
+    for i in range(data_df.shape[1]):
+        values = data_df.iloc[:, i].to_numpy(dtype=object)
+        try:
+            arrays.append(pyarrow.array(values, type=pyarrow.string(), from_pandas=True))
+        except (pyarrow.ArrowTypeError, pyarrow.ArrowInvalid):
+            # Pure text columns convert directly; other cells are turned into strings with str(), as in to_csv
+            arrays.append(pyarrow.array([str(value) for value in values], mask=pd.isna(values)))
+    # Empty header cells (None or NaN) are written empty, as in to_csv
+    names = ['' if pd.isna(col) else str(col) for col in data_df.columns]
+    options = pyarrow.csv.WriteOptions(include_header=write_header)
+    pyarrow.csv.write_csv(pyarrow.Table.from_arrays(arrays, names=names), csv_fh, options)
+
+def _find_excel_files(folder_path, extensions):
+    """
+    Returns the files in the folder with the first of extensions that has any (for example .xlsm,
+    or .xlsx if there are none), in one pass over the directory, newest first.
+    As with glob, names are matched case-insensitively only on Windows. Hidden files and the lock
+    files Excel creates next to an open workbook (~$...) are skipped.
+    """
+    found = {extension: [] for extension in extensions}
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            name = os.path.normcase(entry.name)
+            if name.startswith(('.', '~$')) or not entry.is_file():
+                continue
+            extension = os.path.splitext(name)[1]
+            if extension in found:
+                found[extension].append((entry.stat().st_mtime_ns, entry.path))
+    # Equal modification times are ordered by name, so the order does not depend on the file system
+    excel_files = sorted(next((files for files in found.values() if files), []), key=lambda item: (-item[0], item[1]))
+    return [path for _, path in excel_files]
+
+def _row_width(row):
+    """Number of cells in the row without the trailing empty ones, which is how pd.read_excel measures a row."""
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+# Cell texts pd.read_excel reads as missing: pandas' default na_values and Excel's error values
+# (openpyxl's ERROR_CODES), which openpyxl returns as text when only the values are read
+_MISSING_CELL_TEXTS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+    '#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!',
+])
+
+def convert_cells(values):
+    """
+    Converts cell values read by openpyxl the way pd.read_excel does: whole-number floats become int
+    (1.234567890123457e+19 -> 12345678901234569216), missing-value texts and error values become None.
+    Returns a list. Used by Excel_CSVCombinerApp_v4_8.py too.
+    """
+    return [None if value.__class__ is str and value in _MISSING_CELL_TEXTS
+            else int(value) if value.__class__ is float and value.is_integer()
+            else value
+            for value in values]
+
+def _read_sheet(file, sheet_name, header_row, data_start_row, columns_to_extract, messages, log_lines):
+    """
+    Reads the needed columns of the sheet into a DataFrame with cell values converted like pd.read_excel does.
+    Warnings are added to log_lines; if there is nothing to read, returns None.
+    """
+    # Read-only mode streams the sheet row by row instead of loading it into a DataFrame whole
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        # Like pd.read_excel, do not trust the stored sheet size: when it is stale, the stream stops
+        # early or cuts columns. Short rows are padded below
+        ws.reset_dimensions()
+        # The header and the data are read in one pass over the sheet; the rows between them are skipped.
+        # For all columns the sheet is, as in pd.read_excel, as wide as its longest row, so it is
+        # read from the top: the rows above the header count towards the width too
+        all_columns = not columns_to_extract
+        sheet_rows = ws.iter_rows(min_row=1 if all_columns else header_row + 1, values_only=True)
+        width = 0
+        if all_columns:
+            for row in itertools.islice(sheet_rows, header_row):
+                width = max(width, _row_width(row))
+        # An empty header row comes back as (); as in pd.read_excel, it gives unnamed columns
+        header = next(sheet_rows, None) or ()
+
+        # Header names are converted like the cells below: an 'NA' or #N/A header cell gives an unnamed column
+        column_names = convert_cells(header)
+        # First position of every name in the header, so the header list is not searched
+        column_positions = {}
+        for i, col in enumerate(column_names):
+            column_positions.setdefault(col, i)
+        if not all_columns:
+            existing_cols = [col for col in columns_to_extract if col in column_positions]
+            # Usually every needed column is there, and the second pass is not needed
+            missing_cols = []
+            if len(existing_cols) < len(columns_to_extract):
+                missing_cols = [col for col in columns_to_extract if col not in column_positions]
+            if existing_cols:
+                # The column positions are known from the header before the data is read, so no extra cells are kept.
+                # itemgetter picks them at C level; for one column it returns the value itself, which DataFrame accepts too
+                pick_cells = operator.itemgetter(*[column_positions[col] for col in existing_cols])
+            width = len(column_names)
+        else:
+            width = max(width, _row_width(header))
+
+        # The rows between the header and the data are skipped, but the last non-empty one is remembered:
+        # as with the previous len(df) < data_start_row check, a sheet shorter than the row before the data is skipped.
+        # For all columns they set the sheet width, like the rows above the header
+        last_row = header_row if _row_width(header) else -1
+        skipped_rows = itertools.islice(sheet_rows, max(data_start_row - header_row - 1, 0))
+        for row_index, row in enumerate(skipped_rows, header_row + 1):
+            row_width = _row_width(row)
+            if row_width:
+                last_row = row_index
+            if all_columns:
+                width = max(width, row_width)
+
+        rows = []
+        rows_with_data = 0
+        if not all_columns and not existing_cols:
+            # Nothing to read; it only matters whether the sheet has any data rows
+            rows_with_data = int(any(_row_width(row) for row in sheet_rows))
+        elif all_columns:
+            for row in sheet_rows:
+                row_width = _row_width(row)
+                width = max(width, row_width)
+                rows.append(row)
+                if row_width:
+                    rows_with_data = len(rows)
+        else:
+            for row in sheet_rows:
+                if len(row) < width:
+                    row += (None,) * (width - len(row))
+                rows.append(pick_cells(row))
+                if row.count(None) != len(row):
+                    rows_with_data = len(rows)
+    finally:
+        wb.close()
+
+    if not rows_with_data and last_row < data_start_row - 1:
+        log_lines.append(messages['not_enough_rows'])
+        return None
+    if not all_columns:
+        if missing_cols:
+            log_lines.append(messages['missing_columns'].format(columns=', '.join(missing_cols)))
+        if not existing_cols:
+            log_lines.append(messages['no_columns'])
+            return None
+
+    # pd.read_excel dropped the empty rows at the end of the sheet (judged by all cells, not just the needed ones)
+    del rows[rows_with_data:]
+    # Cells are converted only now: the checks above count error and 'NA' cells as data, as pd.read_excel did
+    if all_columns:
+        # Cells right of the header become unnamed columns, short rows are padded to the sheet width
+        existing_cols = column_names[:width] + [None] * (width - len(column_names))
+        rows = [convert_cells(row[:width]) + [None] * (width - len(row)) for row in rows]
+    elif len(existing_cols) > 1:
+        rows = [convert_cells(row) for row in rows]
+    else:
+        rows = convert_cells(rows)  # One column: itemgetter gave the values themselves
+    # dtype=object keeps the converted values as they are instead of inferring a type per column
+    return pd.DataFrame(rows, columns=existing_cols, dtype=object)
+
+def parquet_cache_path(file, read_args, cache_dir):
+    """
+    Path of the file's cache entry. The name starts with a hash of the file path and the read settings
+    (read_args), followed by a hash of the file's size and modification time. Entries for other read
+    settings of the same file have another prefix and are kept; a changed file replaces the entry with its prefix.
+    """
+    path = os.path.abspath(file)
+    stat = os.stat(file)
+    entry_key = "|".join([path, repr(read_args)])
+    version_key = "|".join([str(stat.st_size), str(stat.st_mtime_ns)])
+    entry_hash = hashlib.sha1(entry_key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, entry_hash + '-' + hashlib.sha1(version_key.encode('utf-8')).hexdigest() + '.parquet')
+
+# Struct field for whole numbers past int64, which Arrow has no integer type for; they are stored as text
+_BIG_INT_FIELD = 'bigint'
+
+def _cache_field(value):
+    """Name of the struct field a cell value is stored in: the name of its Python type, or _BIG_INT_FIELD."""
+    if value.__class__ is int and not -2**63 <= value < 2**63:
+        return _BIG_INT_FIELD
+    return value.__class__.__name__
+
+def _to_cache_column(values):
+    """
+    Converts one column of cell values to an Arrow array. A Parquet column has a single type, so a
+    column mixing e.g. 20 and 1.5 or '00123' and 456 is stored as a struct with one field per Python
+    type, where each cell fills only the field of its own type. Every cell then reads back unchanged.
+    """
+    cell_fields = [None if value is None else _cache_field(value) for value in values]
+    field_names = list(dict.fromkeys(field for field in cell_fields if field is not None))
+    if len(field_names) <= 1 and _BIG_INT_FIELD not in field_names:
+        return pyarrow.array(values)
+    fields = [pyarrow.array([(str(value) if field == _BIG_INT_FIELD else value) if cell_field == field else None
+                             for value, cell_field in zip(values, cell_fields)])
+              for field in field_names]
+    return pyarrow.StructArray.from_arrays(fields, names=field_names)
+
+def _from_cache_column(column):
+    """Reads a column written by _to_cache_column back as a list of Python values."""
+    values = column.to_pylist()
+    if pyarrow.types.is_struct(column.type):
+        values = [next(((int(value) if field == _BIG_INT_FIELD else value) for field, value in cell.items() if value is not None), None)
+                  for cell in values]
+    return values
+
+def write_parquet_cache(data_df, cache_path):
+    """
+    Saves a read sheet to the cache; errors are left to the caller. The columns are stored under their
+    positions, because Parquet needs unique text names. The real names (possibly empty or repeated, and
+    not always text) are kept in the file's metadata in the same encoding as the cells.
+    """
+    _import_modules()
+    # By position, so repeated names still give one array each
+    arrays = [_to_cache_column(data_df.iloc[:, i].tolist()) for i in range(data_df.shape[1])]
+    names_table = pyarrow.table({'name': _to_cache_column(list(data_df.columns))})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, names_table.schema) as writer:
+        writer.write_table(names_table)
+    table = pyarrow.Table.from_arrays(arrays, names=[str(i) for i in range(len(arrays))])
+    table = table.replace_schema_metadata({b'column_names': sink.getvalue().to_pybytes()})
+    cache_dir, cache_name = os.path.split(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first so an interrupted run never leaves a broken cache entry
+    pyarrow.parquet.write_table(table, cache_path + '.tmp', compression='zstd')
+    os.replace(cache_path + '.tmp', cache_path)
+    # Entries for older versions of the file with these read settings are not needed anymore
+    entry_prefix = cache_name.split('-', 1)[0] + '-'
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(entry_prefix) and entry.name != cache_name:
+                os.remove(entry.path)
+
+def read_parquet_cache(cache_path):
+    """Reads a cached sheet back with its real column names, as object columns of Python values with None for empty cells."""
+    _import_modules()
+    table = pyarrow.parquet.read_table(cache_path)
+    names_table = pyarrow.ipc.open_stream(table.schema.metadata[b'column_names']).read_all()
+    columns = [_from_cache_column(column) for column in table.columns]
+    data_df = pd.DataFrame(dict(enumerate(columns)), index=pd.RangeIndex(table.num_rows), dtype=object)
+    data_df.columns = _from_cache_column(names_table.column('name').combine_chunks())
+    return data_df
+
+def _process_one(file, sheet_name, header_row, data_start_row, columns_to_extract, messages, column_dtypes, cache_dir):
+    """
+    Reads and filters one Excel file. Runs in a separate process, so log messages are not
+    written right away but collected and returned. cache_dir is the cache folder, or None if the cache is off.
+    Returns (file name, data_df or None, log lines).
+    """
+    _import_modules()
+    name = os.path.basename(file)
+    log_lines = []
+    try:
+        # An unchanged file (same size and modification time) is not parsed again but taken from the cache
+        read_args = (sheet_name, header_row, data_start_row, columns_to_extract)
+        cache_path = parquet_cache_path(file, read_args, cache_dir) if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            data_df = read_parquet_cache(cache_path)
+            log_lines.append(messages['from_cache'])
+            missing_cols = [col for col in columns_to_extract if col not in data_df.columns]
+            if missing_cols:
+                log_lines.append(messages['missing_columns'].format(columns=', '.join(missing_cols)))
+        else:
+            data_df = _read_sheet(file, sheet_name, header_row, data_start_row, columns_to_extract, messages, log_lines)
+            if data_df is None:
+                return name, None, log_lines
+            if cache_path:
+                # A write error does not stop processing, it only goes to the log
+                try:
+                    write_parquet_cache(data_df, cache_path)
+                except Exception as e:
+                    log_lines.append(messages['cache_not_saved'].format(error=e))
+
+        if column_dtypes:
+            # Known column types; a column that cannot be converted is left as it is
+            data_df = data_df.astype({col: dtype for col, dtype in column_dtypes.items() if col in data_df.columns}, errors='ignore')
+
+        # One int8 code per row instead of a Python object; this also shrinks the table sent back from the worker process
+        data_df['source_file'] = pd.Categorical.from_codes(np.zeros(len(data_df), dtype=np.int8), categories=[name])
+        log_lines.append(messages['extracted'].format(rows=len(data_df), columns=len(data_df.columns) - 1))
+        return name, data_df, log_lines
+
+    except Exception as e:
+        log_lines.append(messages['file_error'].format(error=e))
+        return name, None, log_lines
+
+# On Windows ProcessPoolExecutor refuses more than 61 workers, whatever the number of CPUs
+_MAX_WORKERS = 61
+
+def _read_files(excel_files, read_args):
+    """
+    Yields (index, result) for every file as it is ready. Reading Excel is CPU-bound, so the
+    files are parsed in separate processes; a single file is read directly.
+    """
+    if len(excel_files) == 1:
+        yield 0, _process_one(excel_files[0], *read_args)
+        return
+    with ProcessPoolExecutor(max_workers=min(len(excel_files), os.cpu_count() or 1, _MAX_WORKERS)) as executor:
+        futures = {executor.submit(_process_one, file, *read_args): index for index, file in enumerate(excel_files)}
+        for future in as_completed(futures):
+            # A future keeps its result; drop it from the dict so the file's table is freed once it is written
+            yield futures.pop(future), future.result()
+
+def _read_header(file, sheet_name, header_row):
+    """Reads only the header row of the sheet. If the file cannot be read, returns an empty list: the main pass reports the error."""
+    _import_modules()
+    try:
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet_name]
+            ws.reset_dimensions()
+            header = next(ws.iter_rows(min_row=header_row + 1, max_row=header_row + 1, values_only=True), None) or ()
+        finally:
+            wb.close()
+    except Exception:
+        return []
+    return convert_cells(header[:_row_width(header)])
+
+def _read_headers(excel_files, sheet_name, header_row):
+    """Headers of all files in file order; like the sheets themselves, they are read in separate processes."""
+    with ProcessPoolExecutor(max_workers=min(len(excel_files), os.cpu_count() or 1, _MAX_WORKERS)) as executor:
+        return list(executor.map(_read_header, excel_files, itertools.repeat(sheet_name), itertools.repeat(header_row)))
+
+def _extra_columns(columns, output_columns):
+    """
+    Columns from columns that are not in output_columns. A repeated name is counted as many times
+    as output_columns is short of its occurrences.
+    """
+    # Empty header cells (None and NaN) count as one name
+    counts = {}
+    for col in output_columns:
+        key = None if pd.isna(col) else col
+        counts[key] = counts.get(key, 0) + 1
+    extra = []
+    for col in columns:
+        key = None if pd.isna(col) else col
+        counts[key] = counts.get(key, 0) - 1
+        if counts[key] < 0:
+            extra.append(col)
+    return extra
+
+def _align_columns(data_df, output_columns):
+    """
+    Brings the table's columns in line with the output columns; missing ones are filled with empty values.
+    reindex does not accept repeated names, so for them the n-th occurrence of a name in the
+    output columns is taken from its n-th occurrence in the table.
+    """
+    if data_df.columns.is_unique:
+        return data_df.reindex(columns=output_columns)
+    # Empty header cells (None and NaN) count as one name
+    positions = {}
+    for i, col in enumerate(data_df.columns):
+        positions.setdefault(None if pd.isna(col) else col, []).append(i)
+    seen = {}
+    take = []
+    for col in output_columns:
+        key = None if pd.isna(col) else col
+        n = seen[key] = seen.get(key, -1) + 1
+        found = positions.get(key, ())
+        # -1 points to an empty column added at the end
+        take.append(found[n] if n < len(found) else -1)
+    padded = data_df.copy(deep=False)
+    padded.insert(padded.shape[1], None, None, allow_duplicates=True)
+    aligned = padded.iloc[:, take]
+    aligned.columns = output_columns
+    return aligned
+
+def _in_file_order(results):
+    """
+    Passes on the (index, result) pairs from _read_files in file order. Files that finish early
+    wait until the ones before them are processed, so the row order does not depend on process speed.
+    """
+    pending = {}
+    next_index = 0
+    for index, result in results:
+        pending[index] = result
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+
+def process_excel_files(settings, log_callback, messages, column_dtypes=None, extensions=('.xlsm', '.xlsx')):
+    """
+    Core logic to process files. Takes the settings, a logging function and a dictionary of
+    message texts (see MESSAGES in combine_app_en.py for the keys). columns_to_extract in the settings is a
+    comma-separated string or a list of names; the optional enable_parquet_cache and fast_io turn on the cache of
+    read sheets and CSV writing with pyarrow. column_dtypes sets the types of known columns, extensions lists the
+    file extensions in order of preference. Returns True if the output file was written.
+    """
+    _import_modules()
+    folder_path = settings['folder_path']
+    sheet_name = settings['sheet_name']
+    header_row = settings['header_row'] - 1  # Pandas uses 0-based indexing
+    data_start_row = settings['data_start_row'] - 1  # Pandas uses 0-based indexing
+    columns_to_extract = settings['columns_to_extract']
+    if isinstance(columns_to_extract, str):
+        columns_to_extract = columns_to_extract.split(',')
+    columns_to_extract = [col.strip() for col in columns_to_extract if col.strip()]
+    output_file = settings['output_file']
+
+    log_callback(messages['start'].format(folder=folder_path))
+
+    # Look for .xlsm first; if there are none, look for .xlsx
+    excel_files = _find_excel_files(folder_path, extensions)
+
+    if not excel_files:
+        log_callback(messages['no_files'])
+        return False
+
+    log_callback(messages['found'].format(count=len(excel_files)))
+
+    fast_io = settings.get('fast_io', False)
+    if fast_io and pyarrow is None:
+        log_callback(messages['fast_io_unavailable'])
+    # The Parquet cache is turned on in the settings; the path is absolute because files are read in worker processes
+    cache_dir = None
+    if settings.get('enable_parquet_cache', False):
+        if pyarrow is None:
+            log_callback(messages['cache_unavailable'])
+        else:
+            cache_dir = os.path.abspath(CACHE_DIR)
+
+    # Each file's rows are appended to the CSV right after it is read instead of being collected in memory
+    csv_fh = None
+    total_rows = 0
+    read_args = (sheet_name, header_row, data_start_row, columns_to_extract, messages, column_dtypes, cache_dir)
+    file_count = len(excel_files)
+    # For all columns the output columns are the union of every file's columns, as pd.concat used to give.
+    # Rows are written right away, so the files' headers are read beforehand in a separate fast pass
+    headers = None
+    if not columns_to_extract and file_count > 1:
+        headers = _read_headers(excel_files, sheet_name, header_row)
+    try:
+        for i, (name, data_df, log_lines) in enumerate(_in_file_order(_read_files(excel_files, read_args)), 1):
+            log_callback(messages['processing'].format(index=i, count=file_count, name=name) + "".join(log_lines))
+            if data_df is None:
+                continue
+
+            write_header = csv_fh is None
+            if write_header:
+                # The columns are fixed at the first write: the needed columns, or this file's columns
+                # together with the columns of the following files
+                output_columns = columns_to_extract + ['source_file'] if columns_to_extract else list(data_df.columns)
+                for header in headers[i:] if headers else ():
+                    output_columns += _extra_columns(header, output_columns)
+                output_column_set = frozenset(output_columns)
+                # Write to a temporary file next to it: the previous report is only replaced after a successful write
+                csv_fh = open(output_file + '.tmp', 'wb')
+                # The BOM makes Excel open the file as UTF-8, like the previous 'utf-8-sig' encoding
+                csv_fh.write(b'\xef\xbb\xbf')
+            # Only unnamed columns right of the header that were not in the first file are left out of the output
+            if data_df.columns.is_unique:
+                skipped = [col for col in data_df.columns if col not in output_column_set]
+            else:
+                skipped = _extra_columns(data_df.columns, output_columns)
+            if skipped:
+                log_callback(messages['columns_skipped'].format(columns=', '.join(map(str, skipped))))
+            # Usually the file's columns already match the output ones, and reindex would only copy the table
+            if list(data_df.columns) != output_columns:
+                data_df = _align_columns(data_df, output_columns)
+            _write_csv_rows(data_df, csv_fh, write_header, fast_io)
+            total_rows += len(data_df)
+
+        if csv_fh is None:
+            log_callback(messages['nothing_extracted'])
+            return False
+        # The rows are already written; what is left is to finish the file and put it in place of the previous report.
+        # os.replace fails when the previous report is open in Excel, so it stays inside the cleanup of the temporary file
+        log_callback(messages['combining'])
+        csv_fh.close()
+        os.replace(output_file + '.tmp', output_file)
+    except BaseException:
+        if csv_fh is not None:
+            csv_fh.close()
+            os.remove(output_file + '.tmp')
+        raise
+
+    log_callback(messages['done'].format(output_file=output_file))
+    log_callback(messages['total_rows'].format(rows=total_rows))
+    return True
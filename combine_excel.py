@@ -1,6 +1,6 @@
-import pandas as pd
-import os
-import glob
+import multiprocessing
+
+from combine_core import process_excel_files as _process_excel_files
 
 # --- НАСТРОЙКИ ---
 # Укажите путь к папке, где лежат ваши Excel-файлы.
@@ -38,78 +38,77 @@ COLUMNS_TO_EXTRACT = [
     'Package Weight'
 ]
 
+# Известные типы колонок шаблона Amazon. Значения сразу приводятся к этим типам, а не хранятся
+# как Python-объекты; если в каком-то файле колонку привести не удается, она остается как есть.
+# Цены и размеры здесь не указаны: как float они записывались бы в CSV иначе, чем в Excel
+# (20 -> 20.0, а float32 превращает 1.1 в 1.100000023841858).
+COLUMN_DTYPES = {
+    'SKU': 'string',
+    'Title': 'string',
+    'Product Type': 'string',
+    'Parentage Level': 'string',
+    'Parent SKU': 'string',
+    'Product Id': 'string',
+    'Handling Time (US)': 'Int32',
+    'Size': 'string'
+}
+
 # Имя итогового файла, в который будут собраны все данные.
 OUTPUT_FILE = 'combined_data.csv'
+
+# True - записывать CSV через pyarrow, если он установлен. Так быстрее, но все текстовые значения
+# оказываются в кавычках, а файл отличается от прежнего побайтно.
+FAST_IO = False
+
+# True - хранить прочитанные листы в папке .combiner_cache (нужен pyarrow), чтобы при повторном запуске
+# неизмененные файлы не разбирались заново. Кэш файла обновляется, когда меняется он сам или настройки выше.
+ENABLE_PARQUET_CACHE = False
 # --- КОНЕЦ НАСТРОЕК ---
 
+# Сообщения для combine_core; значения в {} подставляются при выводе
+MESSAGES = {
+    "start": "--- Начинаю обработку файлов в папке: {folder} ---\n",
+    "no_files": "ОШИБКА: В указанной папке не найдено ни одного .xlsm файла.\n",
+    "found": "Найдено файлов для обработки: {count}\n",
+    "processing": "\n-> Обрабатываю файл: {name}\n",
+    "not_enough_rows": "  - ПРЕДУПРЕЖДЕНИЕ: В файле недостаточно строк для извлечения данных. Пропускаю.\n",
+    "missing_columns": "  - ПРЕДУПРЕЖДЕНИЕ: В этом файле отсутствуют колонки: {columns}\n",
+    "no_columns": "  - ПРЕДУПРЕЖДЕНИЕ: Ни одна из указанных колонок не найдена в файле. Пропускаю.\n",
+    "from_cache": "  - Прочитано из кэша.\n",
+    "cache_not_saved": "  - ПРЕДУПРЕЖДЕНИЕ: Не удалось сохранить кэш файла: {error}\n",
+    "cache_unavailable": "ПРЕДУПРЕЖДЕНИЕ: Кэш Parquet включен, но pyarrow не установлен. Кэш отключен.\n",
+    "fast_io_unavailable": "ПРЕДУПРЕЖДЕНИЕ: Быстрая запись включена, но pyarrow не установлен. CSV записывается обычным способом.\n",
+    "extracted": "  - Успешно извлечено {rows} строк из {columns} колонок.\n",
+    "file_error": "  - ОШИБКА при обработке файла: {error}\n",
+    "columns_skipped": "  - ПРЕДУПРЕЖДЕНИЕ: Колонки, для которых нет места в итоговом файле, не записываются: {columns}\n",
+    "nothing_extracted": "\nНе удалось извлечь данные ни из одного файла.\n",
+    "combining": "\n--- Объединяю все данные... ---\n",
+    "done": "\n🎉 Готово! Все данные успешно объединены в один файл: {output_file}\n",
+    "total_rows": "Всего обработано строк: {rows}\n"
+}
+
 
 def process_excel_files(folder_path, sheet_name, header_row, data_start_row, columns_to_extract, output_file):
     """
     Обрабатывает все Excel-файлы в указанной папке, извлекает данные
-    из указанных колонок и объединяет их в один файл.
+    из указанных колонок и объединяет их в один файл. Сама обработка - в combine_core.
     """
-    print(f"--- Начинаю обработку файлов в папке: {folder_path} ---")
-    
-    excel_files = glob.glob(os.path.join(folder_path, "*.xlsm"))
-
-    if not excel_files:
-        print("ОШИБКА: В указанной папке не найдено ни одного .xlsm файла.")
-        return
-
-    print(f"Найдено файлов для обработки: {len(excel_files)}")
-    
-    all_data_frames = []
-
-    for file in excel_files:
-        print(f"\n-> Обрабатываю файл: {os.path.basename(file)}")
-        try:
-            df = pd.read_excel(file, sheet_name=sheet_name, header=None)
-
-            if len(df) < data_start_row:
-                print(f"  - ПРЕДУПРЕЖДЕНИЕ: В файле недостаточно строк для извлечения данных. Пропускаю.")
-                continue
-
-            column_names = df.iloc[header_row]
-            data_df = df.iloc[data_start_row:].copy()
-            data_df.columns = column_names
-            data_df.reset_index(drop=True, inplace=True)
-            
-            # ИЗМЕНЕНИЕ: Логика фильтрации колонок
-            if columns_to_extract:
-                # Проверяем, какие из нужных колонок есть в текущем файле
-                existing_cols = [col for col in columns_to_extract if col in data_df.columns]
-                missing_cols = [col for col in columns_to_extract if col not in data_df.columns]
-                
-                if missing_cols:
-                    print(f"  - ПРЕДУПРЕЖДЕНИЕ: В этом файле отсутствуют колонки: {', '.join(missing_cols)}")
-                
-                if not existing_cols:
-                    print("  - ПРЕДУПРЕЖДЕНИЕ: Ни одна из указанных колонок не найдена в файле. Пропускаю.")
-                    continue
-
-                # Выбираем только те колонки, которые существуют
-                data_df = data_df[existing_cols]
-
-            data_df['source_file'] = os.path.basename(file)
-            all_data_frames.append(data_df)
-            print(f"  - Успешно извлечено {len(data_df)} строк из {len(data_df.columns)-1} колонок.")
-
-        except Exception as e:
-            print(f"  - ОШИБКА при обработке файла: {e}")
-
-    if not all_data_frames:
-        print("\nНе удалось извлечь данные ни из одного файла.")
-        return
-
-    print("\n--- Объединяю все данные... ---")
-    final_df = pd.concat(all_data_frames, ignore_index=True)
-
-    final_df.to_csv(output_file, index=False, encoding='utf-8-sig')
-    
-    print(f"\n🎉 Готово! Все данные успешно объединены в один файл: {output_file}")
-    print(f"Всего обработано строк: {len(final_df)}")
+    settings = {
+        "folder_path": folder_path,
+        "sheet_name": sheet_name,
+        # combine_core считает строки с 1, а здесь они заданы индексами с 0
+        "header_row": header_row + 1,
+        "data_start_row": data_start_row + 1,
+        "columns_to_extract": columns_to_extract,
+        "output_file": output_file,
+        "fast_io": FAST_IO,
+        "enable_parquet_cache": ENABLE_PARQUET_CACHE
+    }
+    _process_excel_files(settings, lambda message: print(message, end=''), MESSAGES,
+                         column_dtypes=COLUMN_DTYPES, extensions=('.xlsm',))
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     # ИЗМЕНЕНИЕ: передаем новый параметр в функцию
     process_excel_files(FOLDER_PATH, SHEET_NAME, HEADER_ROW, DATA_START_ROW, COLUMNS_TO_EXTRACT, OUTPUT_FILE)
\ No newline at end of file